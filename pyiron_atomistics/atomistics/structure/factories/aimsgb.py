@@ -2,7 +2,6 @@
 # Copyright (c) Max-Planck-Institut für Eisenforschung GmbH - Computational Materials Design (CM) Department
 # Distributed under the terms of "New BSD License", see the LICENSE file.
 
-from aimsgb import GrainBoundary, Grain, GBInformation
 from pyiron_atomistics.atomistics.structure.atoms import (
     pyiron_to_pymatgen,
     pymatgen_to_pyiron,
@@ -42,6 +41,8 @@ class AimsgbFactory:
         To construct the grain boundary select a GB plane and sigma value from the list and pass it to the
         GBBuilder.gb_build() function along with the rotational axis and initial bulk structure.
         """
+        from aimsgb import GBInformation
+
         return GBInformation(axis=axis, max_sigma=max_sigma)
 
     @staticmethod
@@ -81,6 +82,8 @@ class AimsgbFactory:
         Returns:
             :class:`.Atoms`: final grain boundary structure
         """
+        from aimsgb import GrainBoundary, Grain
+
         basis_pymatgen = pyiron_to_pymatgen(initial_struct)
         grain_init = Grain(
             basis_pymatgen.lattice, basis_pymatgen.species, basis_pymatgen.frac_coords
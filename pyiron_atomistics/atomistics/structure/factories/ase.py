@@ -2,7 +2,7 @@
 # Copyright (c) Max-Planck-Institut für Eisenforschung GmbH - Computational Materials Design (CM) Department
 # Distributed under the terms of "New BSD License", see the LICENSE file.
 
-from functools import wraps
+from functools import lru_cache, wraps
 from inspect import getmodule
 from ase.build import (
     cut as ase_cut,
@@ -30,6 +30,14 @@ __status__ = "production"
 __date__ = "Feb 26, 2021"
 
 
+# built once, adding it again for every structure is only a key lookup in pyiron_base
+_ASE_PUBLICATION = publication_ase()
+
+
+def _add_ase_publication():
+    state.publications.add(_ASE_PUBLICATION)
+
+
 def _ase_header(ase_func):
     chain = getmodule(ase_func).__name__
     name = chain.split(".")[-1]
@@ -45,7 +53,7 @@ def _ase_wraps(ase_func):
     def decorator(func):
         @wraps(ase_func)
         def wrapper(*args, **kwargs):
-            state.publications.add(publication_ase())
+            _add_ase_publication()
             return func(*args, **kwargs)
 
         wrapper.__doc__ = _ase_header(ase_func) + wrapper.__doc__
@@ -54,10 +62,40 @@ def _ase_wraps(ase_func):
     return decorator
 
 
+def _memoize_structure(func):
+    """
+    Cache the structures returned by func for hashable arguments.
+
+    Callers always get a copy of the cached structure, so that modifying it does not change later results.  Calls with
+    unhashable arguments, e.g. numpy arrays, are passed on to func uncached.
+    """
+    cached = lru_cache(maxsize=512)(func)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            hash((args, tuple(kwargs.values())))
+        except TypeError:
+            return func(*args, **kwargs)
+        return cached(*args, **kwargs).copy()
+
+    return wrapper
+
+
+@_memoize_structure
+def _bulk(*args, **kwargs):
+    return ase_to_pyiron(ase_bulk(*args, **kwargs))
+
+
+@_memoize_structure
+def _crystal(*args, **kwargs):
+    return ase_to_pyiron(ase_crystal(*args, **kwargs))
+
+
 class AseFactory:
     @_ase_wraps(ase_bulk)
     def bulk(self, *args, **kwargs):
-        return ase_to_pyiron(ase_bulk(*args, **kwargs))
+        return _bulk(*args, **kwargs)
 
     @_ase_wraps(ase_cut)
     def cut(self, *args, **kwargs):
@@ -69,7 +107,7 @@ class AseFactory:
 
     @_ase_wraps(ase_crystal)
     def crystal(self, *args, **kwargs):
-        return ase_to_pyiron(ase_crystal(*args, **kwargs))
+        return _crystal(*args, **kwargs)
 
     @_ase_wraps(ase_read)
     def read(self, *args, **kwargs):
@@ -2,13 +2,27 @@
 # Copyright (c) Max-Planck-Institut für Eisenforschung GmbH - Computational Materials Design (CM) Department
 # Distributed under the terms of "New BSD License", see the LICENSE file.
 
+import atexit
 import subprocess
 import tempfile
+import threading
+import uuid
+import hashlib
 import os.path
 import shutil
+import sys
 import io
-
-from pyiron_atomistics.atomistics.structure.atoms import ase_to_pyiron
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import chain
+from multiprocessing import cpu_count
+
+from pyiron_base import state
+from pyiron_atomistics.atomistics.structure.atoms import Atoms, ase_to_pyiron
+from pyiron_atomistics.atomistics.structure.periodic_table import PeriodicTable
 
 from ase.io import read, write
 import numpy as np
@@ -25,12 +39,147 @@ __status__ = "production"
 __date__ = "Jun 30, 2021"
 
 _ATOMSK_EXISTS = shutil.which("atomsk") != None
+# pipe buffer size for communication with atomsk, large enough to hold big structures in one write
+_PIPE_SIZE = 1 << 20
+# number of chunks read from stderr of atomsk that are kept for the log, older chunks are discarded
+_STDERR_CHUNKS = 16
+_EXYZ_LATTICE = re.compile(r'Lattice="([^"]*)"')
+_EXYZ_PROPERTIES = re.compile(r"Properties=(\S+)")
+_EXYZ_PBC = re.compile(r'pbc="([^"]*)"')
 
 
 class AtomskError(Exception):
     pass
 
 
+def _to_exyz(structure):
+    """Serialize structure to extxyz in memory."""
+    if set(structure.arrays) - {"numbers", "positions"} or structure.cell.rank < 3:
+        # anything beyond species and positions in a periodic cell is left to ASE
+        buffer = io.StringIO()
+        write(buffer, structure, format="extxyz")
+        return buffer.getvalue().encode("utf8")
+    lattice = " ".join(map(repr, np.asarray(structure.cell).flatten().tolist()))
+    pbc = " ".join("T" if p else "F" for p in structure.pbc)
+    # formatting python floats with repr is exact and faster than np.savetxt on mixed columns
+    lines = map(
+        "{} {!r} {!r} {!r}".format,
+        structure.get_chemical_symbols(),
+        *structure.positions.T.tolist(),
+    )
+    return "\n".join(
+        [
+            str(len(structure)),
+            f'Lattice="{lattice}" Properties=species:S:1:pos:R:3 pbc="{pbc}"',
+            *lines,
+            "",
+        ]
+    ).encode("utf8")
+
+
+def _read_exyz(stream):
+    """
+    Read a single extxyz frame as written by atomsk.
+
+    The coordinate block is read with numpy directly from the stream instead of the line by line parser of ASE, which
+    only serves as a fall back for frames with additional per atom properties.
+
+    Args:
+        stream (binary file-like object): extxyz output, e.g. stdout of atomsk
+
+    Returns:
+        :class:`.Atoms`: parsed structure
+
+    Raises:
+        :class:`.AtomskError`: if the stream does not start with an extxyz frame, e.g. because atomsk failed
+    """
+    header = stream.readline()
+    try:
+        natoms = int(header)
+    except ValueError:
+        output = header + stream.read()
+        _check_output(output)
+        raise AtomskError(
+            f"atomsk returned unexpected output: {output.decode('utf8', errors='replace')}"
+        ) from None
+    comment = stream.readline()
+    info = comment.decode("utf8")
+    lattice = _EXYZ_LATTICE.search(info)
+    properties = _EXYZ_PROPERTIES.search(info)
+    if (
+        lattice is None
+        or properties is None
+        or properties.group(1).lower() != "species:s:1:pos:r:3"
+    ):
+        frame = header + comment + b"".join(stream.readline() for _ in range(natoms))
+        # ASE only reads text, the wrapper decodes the frame in chunks instead of copying it into one str
+        return ase_to_pyiron(
+            read(io.TextIOWrapper(io.BytesIO(frame), encoding="utf8"), format="extxyz")
+        )
+    pbc = _EXYZ_PBC.search(info)
+    if pbc is not None:
+        pbc = [p.upper().startswith("T") for p in pbc.group(1).split()]
+    else:
+        pbc = True
+    data = np.loadtxt(
+        stream,
+        dtype=[("species", "U16"), ("positions", float, (3,))],
+        max_rows=natoms,
+        ndmin=1,
+    )
+    # species in order of first appearance, as Atoms does when given symbols, but without the per atom lookup
+    species, first, indices = np.unique(
+        data["species"], return_index=True, return_inverse=True
+    )
+    order = np.argsort(first)
+    periodic_table = PeriodicTable()
+    return Atoms(
+        species=[periodic_table.element(el) for el in species[order]],
+        indices=np.argsort(order)[indices],
+        positions=data["positions"],
+        cell=np.array(lattice.group(1).split(), dtype=float).reshape(3, 3),
+        pbc=pbc,
+    )
+
+
+def _write_stdin(stdin, content):
+    """Write all of content to stdin of atomsk and close it."""
+    try:
+        stdin.write(memoryview(content))
+        stdin.close()
+    except BrokenPipeError:
+        # atomsk exited early, its error message is still in stdout
+        try:
+            stdin.close()
+        except BrokenPipeError:
+            pass
+
+
+def _drain(pipe, store, chunk_size=1 << 16):
+    """Read pipe until it is closed, passing every chunk to store."""
+    with pipe:
+        for chunk in iter(partial(pipe.read1, chunk_size), b""):
+            store(chunk)
+
+
+def _log_stderr(returncode, stderr):
+    state.logger.warning(
+        f"atomsk exited with code {returncode}: {stderr.decode('utf8', errors='replace')}"
+    )
+
+
+def _check_output(output):
+    """Raise :class:`.AtomskError` if atomsk reported an error in its output, given as bytes."""
+    # search the raw bytes and only decode the output for the error message
+    if b"X!X ERROR:" not in output:
+        return
+    for l in output.split(b"\n"):
+        if l.strip().startswith(b"X!X ERROR:"):
+            raise AtomskError(
+                f"atomsk returned error: {output.decode('utf8', errors='replace')}"
+            )
+
+
 class AtomskBuilder:
     """Class to build CLI arguments to Atomsk."""
 
@@ -51,18 +200,19 @@ class AtomskBuilder:
 
         self = cls()
 
-        a_and_c = str(a) if c is None else f"{a} {c}"
-        line = f"--create {lattice} {a_and_c} {' '.join(species)}"
+        tokens = ["--create", lattice, str(a)]
+        if c is not None:
+            tokens.append(str(c))
+        tokens.extend(species)
         if hkl is not None:
-            if np.asarray(hkl).shape not in ((3, 3), (3, 4)):
+            if np.shape(hkl) not in ((3, 3), (3, 4)):
                 raise ValueError(
                     f"hkl must have shape 3x3 or 3x4 if provided, not {hkl}!"
                 )
-            line += " orient " + "  ".join(
-                "[" + "".join(map(str, a)) + "]" for a in hkl
-            )
+            tokens.append("orient")
+            tokens.extend("[" + "".join(map(str, v)) + "]" for v in hkl)
         # TODO: check len(species) etc. with the document list of supported phases
-        self._options.append(line)
+        self._options.append(tokens)
         return self
 
     @classmethod
@@ -77,7 +227,8 @@ class AtomskBuilder:
         """
         self = cls()
         self._structure = structure
-        self._options.append("input.exyz")
+        # read input structure from stdin, atomsk cannot guess its format from a file extension there
+        self._options.append(["-", "exyz"])
         return self
 
     def duplicate(self, nx, ny=None, nz=None):
@@ -96,44 +247,82 @@ class AtomskBuilder:
             ny = nx
         if nz is None:
             nz = ny
-        self._options.append(f"-duplicate {nx} {ny} {nz}")
+        self._options.append(["-duplicate", str(nx), str(ny), str(nz)])
         return self
 
-    def build(self):
+    def build(self, debug=False):
         """
         Call Atomsk with the options accumulated so far.
 
+        Args:
+            debug (bool, optional): capture stderr of atomsk and log it if atomsk fails, otherwise it is discarded
+
         Returns:
             :class:`.Atoms`: new structure
         """
-        self._options.append("- exyz")  # output to stdout as exyz format
-        with tempfile.TemporaryDirectory() as temp_dir:
-            if self._structure is not None:
-                write(
-                    os.path.join(temp_dir, "input.exyz"),
-                    self._structure,
-                    format="extxyz",
+        self._options.append(["-", "exyz"])  # output to stdout as exyz format
+        if self._structure is not None:
+            # pass the input structure via stdin instead of a temporary file
+            structure = _to_exyz(self._structure)
+        kwargs = {}
+        if sys.version_info >= (3, 10):
+            kwargs["pipesize"] = _PIPE_SIZE
+        proc = subprocess.Popen(
+            ["atomsk", *chain.from_iterable(self._options)],
+            stdin=subprocess.PIPE
+            if self._structure is not None
+            else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE if debug else subprocess.DEVNULL,
+            **kwargs,
+        )
+        # stdin and stderr are served from their own threads, so that atomsk never blocks on a full pipe while we
+        # parse its stdout
+        threads = []
+        if self._structure is not None:
+            threads.append(
+                threading.Thread(
+                    target=_write_stdin, args=(proc.stdin, structure), daemon=True
+                )
+            )
+        if debug:
+            stderr = deque(maxlen=_STDERR_CHUNKS)
+            threads.append(
+                threading.Thread(
+                    target=_drain, args=(proc.stderr, stderr.append), daemon=True
                 )
-            proc = subprocess.run(
-                ["atomsk", *" ".join(self._options).split()],
-                capture_output=True,
-                cwd=temp_dir,
             )
-            output = proc.stdout.decode("utf8")
-            for l in output.split("\n"):
-                if l.strip().startswith("X!X ERROR:"):
-                    raise AtomskError(f"atomsk returned error: {output}")
-            return ase_to_pyiron(read(io.StringIO(output), format="extxyz"))
+        for thread in threads:
+            thread.start()
+        # parse while atomsk is still writing instead of buffering its whole output first
+        with io.BufferedReader(proc.stdout.raw, buffer_size=_PIPE_SIZE) as stdout:
+            try:
+                return _read_exyz(stdout)
+            finally:
+                stdout.read()
+                proc.wait()
+                for thread in threads:
+                    thread.join()
+                if proc.returncode != 0 and debug:
+                    _log_stderr(proc.returncode, b"".join(stderr))
 
     def __getattr__(self, name):
         # magic method to map method calls of the form self.foo_bar to options like -foo-bar; arguments converted str
-        # and appended after option, keyword arguments are mapped to strings like 'key value'
+        # and appended after option, keyword arguments are mapped to arguments like 'key value'
+        flag = "-" + name.replace("_", "-")
+
         def meth(*args, **kwargs):
-            args_str = " ".join(map(str, args))
-            kwargs_str = " ".join(f"{k} {v}" for k, v in kwargs.items())
-            self._options.append(f"-{name.replace('_', '-')} {args_str} {kwargs_str}")
+            self._options.append(
+                [
+                    flag,
+                    *map(str, args),
+                    *chain.from_iterable((k, str(v)) for k, v in kwargs.items()),
+                ]
+            )
             return self
 
+        # store on the instance, so that repeated calls of the same option skip __getattr__
+        self.__dict__[name] = meth
         return meth
 
 
@@ -181,6 +370,26 @@ class AtomskFactory:
     special cases defined on the class.
     """
 
+    # scratch directory shared by all calls to atomsk that need files, created on first use
+    _scratch = None
+    _scratch_lock = threading.Lock()
+
+    @classmethod
+    def _get_scratch(cls):
+        """
+        Return the scratch directory of this process, creating it if necessary.
+
+        It is placed in the directory given by the environment variable `PYIRON_TMPDIR`, if set, and removed when the
+        interpreter exits.
+        """
+        with cls._scratch_lock:
+            if cls._scratch is None:
+                cls._scratch = tempfile.mkdtemp(
+                    prefix="pyiron-atomsk-", dir=os.environ.get("PYIRON_TMPDIR")
+                )
+                atexit.register(shutil.rmtree, cls._scratch, ignore_errors=True)
+            return cls._scratch
+
     def create(self, lattice, a, *species, c=None, hkl=None):
         """
         Create a new structure with Atomsk.
@@ -216,3 +425,157 @@ class AtomskFactory:
             AtomskBuilder: builder instances
         """
         return AtomskBuilder.modify(structure)
+
+    def build_many(self, builders, para_info=None, debug=False):
+        """
+        Build many structures with as few calls to Atomsk as possible.
+
+        Builders that modify structures with the same chain of options are run together in a single call of the list
+        mode of Atomsk, see https://atomsk.univ-lille.fr/doc/en/mode_list.html.  Identical input structures are only
+        passed once to Atomsk.  All other builders are built one by one.  Groups larger than
+        `para_info.num_inputs_per_process` are split and all calls to Atomsk are distributed over
+        `para_info.num_workers` concurrently running Atomsk processes.
+
+        >>> atomsk = pr.create.structure.atomsk
+        >>> structures = [pr.create.structure.bulk("Cu", a=a, cubic=True) for a in (3.5, 3.6, 3.7)]
+        >>> atomsk.build_many([atomsk.modify(s).duplicate(2) for s in structures])
+
+        Args:
+            builders (list of :class:`.AtomskBuilder`): builders as returned by :method:`.create()` or
+                                                        :method:`.modify()`, without calling build on them
+            para_info (:class:`.AtomskParaInfo`, optional): settings for parallel execution, defaults to one Atomsk
+                                                            process per core
+            debug (bool, optional): capture stderr of atomsk and log it if atomsk fails
+
+        Returns:
+            list of :class:`.Atoms`: new structures in the same order as `builders`
+        """
+        if para_info is None:
+            para_info = AtomskParaInfo()
+        tasks = []
+        groups = {}
+        for i, builder in enumerate(builders):
+            if builder._structure is None:
+                tasks.append(([i], partial(_build_single, builder, debug)))
+            else:
+                # first option is the input file, the rest is shared between builders in the same group
+                groups.setdefault(tuple(map(tuple, builder._options[1:])), []).append(i)
+        chunk_size = para_info.num_inputs_per_process
+        for options, indices in groups.items():
+            for start in range(0, len(indices), chunk_size):
+                chunk = indices[start : start + chunk_size]
+                if len(chunk) == 1:
+                    tasks.append(
+                        (chunk, partial(_build_single, builders[chunk[0]], debug))
+                    )
+                else:
+                    tasks.append(
+                        (
+                            chunk,
+                            partial(
+                                _build_list,
+                                options,
+                                [builders[i]._structure for i in chunk],
+                                debug,
+                            ),
+                        )
+                    )
+        if len(tasks) > 1 and para_info.num_workers > 1:
+            # atomsk runs in its own process, so threads waiting on it are enough to run the calls in parallel
+            with ThreadPoolExecutor(max_workers=para_info.num_workers) as executor:
+                results = list(executor.map(lambda task: task(), (t for _, t in tasks)))
+        else:
+            results = [task() for _, task in tasks]
+        structures = [None] * len(builders)
+        for (indices, _), result in zip(tasks, results):
+            for i, structure in zip(indices, result):
+                structures[i] = structure
+        return structures
+
+
+@dataclass
+class AtomskParaInfo:
+    """
+    Settings for :method:`.AtomskFactory.build_many`.
+
+    Attributes:
+        num_workers (int): number of Atomsk processes to run at the same time, defaults to the number of cores
+        num_inputs_per_process (int): maximum number of structures to pass to a single call of Atomsk
+    """
+
+    num_workers: int = field(default_factory=cpu_count)
+    num_inputs_per_process: int = 100
+
+
+def _build_single(builder, debug=False):
+    return [builder.build(debug=debug)]
+
+
+def _build_list(options, structures, debug=False):
+    """
+    Apply the same options to many structures in one call of the Atomsk list mode.
+
+    Args:
+        options (list of list of str): atomsk options to apply, each given as its list of arguments
+        structures (list of :class:`.Atoms`): input structures
+        debug (bool, optional): capture stderr of atomsk and log it if atomsk fails
+
+    Returns:
+        list of :class:`.Atoms`: new structures in the same order as `structures`
+    """
+    scratch = AtomskFactory._get_scratch()
+    # files of concurrent calls share the scratch directory, so prefix them with a unique id
+    prefix = uuid.uuid4().hex
+    list_name = os.path.join(scratch, prefix + ".list")
+    # identical inputs get the same file name and are only converted once
+    names = []
+    digests = {}
+    try:
+        for structure in structures:
+            content = _to_exyz(structure)
+            digest = hashlib.sha1(content).hexdigest()
+            if digest not in digests:
+                digests[digest] = f"{prefix}_{len(digests)}"
+                with open(os.path.join(scratch, digests[digest] + ".exyz"), "wb") as f:
+                    f.write(content)
+            names.append(digests[digest])
+        unique_names = list(digests.values())
+        with open(list_name, "w") as f:
+            f.write("\n".join(name + ".exyz" for name in unique_names) + "\n")
+        proc = subprocess.run(
+            [
+                "atomsk",
+                "--list",
+                prefix + ".list",
+                *chain.from_iterable(options),
+                "exyz",
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE if debug else subprocess.DEVNULL,
+            cwd=scratch,
+        )
+        if proc.returncode != 0 and debug:
+            _log_stderr(proc.returncode, proc.stderr)
+        _check_output(proc.stdout)
+        output = {}
+        for name in unique_names:
+            # atomsk writes extended xyz files with the xyz extension
+            file_name = os.path.join(scratch, name + ".xyz")
+            if not os.path.exists(file_name):
+                raise AtomskError(
+                    f"atomsk did not write output for {name}: {proc.stdout.decode('utf8', errors='replace')}"
+                )
+            with open(file_name, "rb") as f:
+                output[name] = _read_exyz(f)
+    finally:
+        # only the files of this call are removed, the directory itself is reused
+        for file_name in chain(
+            [list_name],
+            *((name + ".exyz", name + ".xyz") for name in digests.values()),
+        ):
+            try:
+                os.remove(os.path.join(scratch, file_name))
+            except FileNotFoundError:
+                pass
+    return [output[name].copy() for name in names]
@@ -1,5 +1,4 @@
 from typing import Union, List
-from mp_api.client import MPRester
 from pyiron_atomistics.atomistics.structure.has_structure import HasStructure
 from pyiron_atomistics.atomistics.structure.structurestorage import StructureStorage
 from pyiron_atomistics.atomistics.structure.atoms import pymatgen_to_pyiron, Atoms
@@ -113,6 +112,8 @@ class MaterialsProjectFactory:
         }
         if api_key is not None:
             rest_kwargs["api_key"] = api_key
+        from mp_api.client import MPRester
+
         with MPRester(**rest_kwargs) as mpr:
             results = mpr.summary.search(
                 chemsys=chemsys, **kwargs, fields=["structure", "material_id"]
@@ -151,5 +152,7 @@ class MaterialsProjectFactory:
         }
         if api_key is not None:
             rest_kwargs["api_key"] = api_key
+        from mp_api.client import MPRester
+
         with MPRester(**rest_kwargs) as mpr:
             return pymatgen_to_pyiron(mpr.get_structure_by_material_id(material_id))
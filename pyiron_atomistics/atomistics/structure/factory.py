@@ -25,7 +25,10 @@ from ase.build import (
     surface as ase_surf,
 )
 import numpy as np
-from pyiron_atomistics.atomistics.structure.factories.ase import AseFactory
+from pyiron_atomistics.atomistics.structure.factories.ase import (
+    AseFactory,
+    _add_ase_publication,
+)
 from pyiron_atomistics.atomistics.structure.factories.atomsk import (
     AtomskFactory,
     _ATOMSK_EXISTS,
@@ -35,9 +38,6 @@ from pyiron_atomistics.atomistics.structure.factories.compound import CompoundFa
 from pyiron_atomistics.atomistics.structure.factories.materialsproject import (
     MaterialsProjectFactory,
 )
-from pyiron_atomistics.atomistics.structure.pyironase import (
-    publication as publication_ase,
-)
 from pyiron_atomistics.atomistics.structure.atoms import (
     CrystalStructure,
     Atoms,
@@ -46,9 +46,8 @@ from pyiron_atomistics.atomistics.structure.atoms import (
     ovito_to_pyiron,
     pyiron_to_pymatgen,
 )
-from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
 from pyiron_atomistics.atomistics.structure.periodic_table import PeriodicTable
-from pyiron_base import state, PyironFactory, deprecate
+from pyiron_base import PyironFactory, deprecate
 import types
 from functools import wraps
 
@@ -63,6 +62,32 @@ __email__ = "surendralal@mpie.de"
 __status__ = "production"
 __date__ = "May 1, 2020"
 
+_SURFACE_BUILDERS = {
+    surface_class.__name__: surface_class
+    for surface_class in (
+        add_adsorbate,
+        add_vacuum,
+        bcc100,
+        bcc110,
+        bcc111,
+        diamond100,
+        diamond111,
+        fcc100,
+        fcc110,
+        fcc111,
+        fcc211,
+        hcp0001,
+        hcp10m10,
+        mx2,
+        hcp0001_root,
+        fcc111_root,
+        bcc111_root,
+        root_surface,
+        root_surface_analysis,
+        ase_surf,
+    )
+}
+
 
 class StructureFactory(PyironFactory):
     def __init__(self):
@@ -189,32 +214,9 @@ class StructureFactory(PyironFactory):
         # https://gitlab.com/ase/ase/blob/master/ase/lattice/surface.py
         if pbc is None:
             pbc = True
-        state.publications.add(publication_ase())
-        for surface_class in [
-            add_adsorbate,
-            add_vacuum,
-            bcc100,
-            bcc110,
-            bcc111,
-            diamond100,
-            diamond111,
-            fcc100,
-            fcc110,
-            fcc111,
-            fcc211,
-            hcp0001,
-            hcp10m10,
-            mx2,
-            hcp0001_root,
-            fcc111_root,
-            bcc111_root,
-            root_surface,
-            root_surface_analysis,
-            ase_surf,
-        ]:
-            if surface_type == surface_class.__name__:
-                surface_type = surface_class
-                break
+        _add_ase_publication()
+        if isinstance(surface_type, str):
+            surface_type = _SURFACE_BUILDERS.get(surface_type, surface_type)
         if isinstance(surface_type, types.FunctionType):
             if center:
                 surface = surface_type(
@@ -247,13 +249,16 @@ class StructureFactory(PyironFactory):
             pyiron_atomistics.atomistics.structure.atoms.Atoms instance: Required surface
         """
         # https://gitlab.com/ase/ase/blob/master/ase/lattice/surface.py
-        state.publications.add(publication_ase())
+        _add_ase_publication()
 
         surface = ase_surf(lattice, hkl, layers)
-        z_max = np.max(surface.positions[:, 2])
+        positions = surface.positions
+        z_max = positions[:, 2].max()
         surface.cell[2, 2] = z_max + vacuum
         if center:
-            surface.positions += 0.5 * surface.cell[2] - [0, 0, z_max / 2]
+            shift = 0.5 * surface.cell[2]
+            shift[2] -= 0.5 * z_max
+            np.add(positions, shift, out=positions)
         surface.pbc = pbc
         return ase_to_pyiron(surface)
 
@@ -575,6 +580,8 @@ class StructureFactory(PyironFactory):
         Returns:
             slab: pyiron_atomistics.atomistics.structure.atoms.Atoms instance Required surface
         """
+        from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
+
         basis = self.crystal(
             element=element,
             bravais_basis=crystal_structure,
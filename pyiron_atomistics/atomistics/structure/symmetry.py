@@ -67,6 +67,8 @@ class Symmetry(dict):
             symprec=symprec, angle_tolerance=angle_tolerance
         ).items():
             self[k] = v
+        # spglib gives integer rotations, convert them once instead of in every matrix product
+        self._float_rotations = np.ascontiguousarray(self["rotations"], dtype=float)
 
     @property
     def arg_equivalent_atoms(self):
@@ -81,7 +83,9 @@ class Symmetry(dict):
         `(m, j)`
         """
         ladder = np.arange(np.prod(self._structure.positions.shape)).reshape(-1, 3)
-        all_vec = np.einsum("nij,nmj->min", self.rotations, ladder[self.permutations])
+        all_vec = np.matmul(
+            ladder[self.permutations], self.rotations.transpose(0, 2, 1)
+        ).transpose(1, 2, 0)
         vec_abs_flat = np.absolute(all_vec).reshape(
             np.prod(self._structure.positions.shape), -1
         )
@@ -130,25 +134,21 @@ class Symmetry(dict):
                 (n_symmetry, original_shape) if return_unique=False, otherwise (n, 3), where n is
                 the number of inequivalent vectors.
         """
-        R = self["rotations"]
+        R = self._float_rotations
         t = self["translations"]
-        x = np.einsum(
-            "jk,nj->nk", np.linalg.inv(self._structure.cell), np.atleast_2d(points)
-        )
-        x = np.einsum("nxy,my->mnx", R, x) + t
+        x = np.atleast_2d(points) @ np.linalg.inv(self._structure.cell)
+        x = np.matmul(x, R.transpose(0, 2, 1)).transpose(1, 0, 2) + t
         if any(self._structure.pbc):
             x[:, :, self._structure.pbc] -= np.floor(
                 x[:, :, self._structure.pbc] + self.epsilon
             )
         if not return_unique:
-            return np.einsum("ji,mnj->mni", self._structure.cell, x).reshape(
-                (len(R),) + np.shape(points)
-            )
+            return (x @ self._structure.cell).reshape((len(R),) + np.shape(points))
         x = x.reshape(-1, 3)
         _, indices = np.unique(
             np.round(x, decimals=decimals), return_index=True, axis=0
         )
-        return np.einsum("ji,mj->mi", self._structure.cell, x[indices])
+        return x[indices] @ self._structure.cell
 
     def get_arg_equivalent_sites(
         self,
@@ -199,13 +199,14 @@ class Symmetry(dict):
             scaled_positions[..., self._structure.pbc] -= np.floor(
                 scaled_positions[..., self._structure.pbc] + self.epsilon
             )
-            tree = cKDTree(scaled_positions)
+            # the tree is queried only once, so a quick build pays off more than a balanced one
+            tree = cKDTree(scaled_positions, balanced_tree=False, compact_nodes=False)
             positions = (
-                np.einsum("nij,kj->nki", self["rotations"], scaled_positions)
+                np.matmul(scaled_positions, self._float_rotations.transpose(0, 2, 1))
                 + self["translations"][:, None, :]
             )
             positions -= np.floor(positions + self.epsilon)
-            distances, self._permutations = tree.query(positions)
+            distances, self._permutations = tree.query(positions, workers=-1)
             if np.ptp(distances) > self._symprec:
                 raise AssertionError("Neighbor search failed")
             self._permutations = self._permutations.argsort(axis=-1)
@@ -225,11 +226,12 @@ class Symmetry(dict):
             (np.ndarray) symmetrized vectors
         """
         v_reshaped = np.reshape(vectors, (-1,) + self._structure.positions.shape)
-        return np.einsum(
-            "ijk,inkm->mnj",
-            self["rotations"],
-            np.einsum("ijk->jki", v_reshaped)[self.permutations],
-        ).reshape(np.shape(vectors)) / len(self["rotations"])
+        # sum over symmetry operations and vector components in a single matrix product
+        return np.tensordot(
+            self._float_rotations,
+            v_reshaped.transpose(1, 2, 0)[self.permutations],
+            axes=([0, 2], [0, 2]),
+        ).transpose(2, 1, 0).reshape(np.shape(vectors)) / len(self["rotations"])
 
     def _get_spglib_cell(self, use_elements=None, use_magmoms=None):
         lattice = np.array(self._structure.get_cell(), dtype="double", order="C")
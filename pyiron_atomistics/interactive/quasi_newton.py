@@ -1,4 +1,8 @@
+from functools import lru_cache
 import numpy as np
+import scipy.linalg
+import scipy.linalg.blas
+import scipy.linalg.lapack
 from pyiron_base import GenericParameters
 import warnings
 from pyiron_atomistics.atomistics.job.interactivewrapper import (
@@ -7,6 +11,184 @@ from pyiron_atomistics.atomistics.job.interactivewrapper import (
 )
 
 
+def _rank_one_update_eig(eigenvalues, eigenvectors, alpha, u):
+    """
+    Eigendecomposition of `V diag(d) V^T + alpha u u^T` from the one of `V diag(d) V^T`.
+
+    The new eigenvalues are the roots of the secular equation `1 + alpha * sum_i z_i^2 / (d_i - x) = 0` with
+    `z = V^T u`, see Bunch, Nielsen and Sorensen, Numer. Math. 31, 31 (1978).  The eigenvectors are computed from the
+    roots following Gu and Eisenstat, SIAM J. Matrix Anal. Appl. 15, 1266 (1994), so that they stay orthogonal.
+    Deflation and the choice of the origin of each root follow LAPACK `dlaed2` and `dlaed4`.
+
+    The update is always computed in double precision, since its tolerances are tighter than single precision
+    resolves, and returned in the precision of the input.
+
+    Args:
+        eigenvalues (numpy.ndarray): eigenvalues `d` in ascending order
+        eigenvectors (numpy.ndarray): eigenvectors `V` as columns
+        alpha (float): weight of the update
+        u (numpy.ndarray): update vector
+
+    Returns:
+        tuple: new eigenvalues in ascending order and the corresponding eigenvectors
+    """
+    dtype = np.result_type(eigenvalues, eigenvectors)
+    if dtype != np.float64:
+        d, V = _rank_one_update_eig(
+            eigenvalues.astype(np.float64),
+            eigenvectors.astype(np.float64),
+            float(alpha),
+            np.asarray(u, dtype=np.float64),
+        )
+        return d.astype(dtype), V.astype(dtype)
+    if alpha < 0:
+        # the roots of the negative update are the negative roots of a positive one
+        d, V = _rank_one_update_eig(
+            -eigenvalues[::-1], eigenvectors[:, ::-1], -alpha, u
+        )
+        return -d[::-1], V[:, ::-1]
+    d = eigenvalues.copy()
+    V = eigenvectors.copy()
+    z = V.T @ u
+    z_norm = np.linalg.norm(z)
+    if alpha * z_norm == 0:
+        return d, V
+    z /= z_norm
+    rho = alpha * z_norm**2
+    eps = np.finfo(float).eps
+    tol = 8 * eps * max(np.abs(d).max(), rho)
+    # deflation: components without weight keep their eigenpair
+    keep = rho * np.abs(z) > tol
+    # deflation: rotate pairs of poles which are close compared to their weights, so that only one of them has weight
+    previous = None
+    for j in np.flatnonzero(keep):
+        if previous is not None:
+            tau = np.hypot(z[j], z[previous])
+            c, s = z[j] / tau, -z[previous] / tau
+            if np.abs((d[j] - d[previous]) * c * s) <= tol:
+                V[:, [previous, j]] = V[:, [previous, j]] @ np.array([[c, -s], [s, c]])
+                d[previous], d[j] = (
+                    d[previous] * c**2 + d[j] * s**2,
+                    d[previous] * s**2 + d[j] * c**2,
+                )
+                z[j], z[previous] = tau, 0
+                keep[previous] = False
+        previous = j
+    idx = np.flatnonzero(keep)
+    dk, zk2 = d[idx], z[idx] ** 2
+    k = len(idx)
+    # root i lies between dk[i] and dk[i + 1], the last one between dk[-1] and dk[-1] + rho
+    gap = np.append(np.diff(dk), rho * zk2.sum())
+    last = np.arange(k) == k - 1
+    poles = dk[None, :] - dk[:, None]  # poles[i, j] = dk[j] - dk[i]
+    # each root is computed as offset from the closer one of its two poles, so that the distance to both stays
+    # accurate; the root is closer to dk[i + 1] if the secular function is negative in the middle of the interval
+    f_mid = 1 / rho + np.sum(zk2 / (poles - 0.5 * gap[:, None]), axis=1)
+    right = (f_mid < 0) & ~last
+    origin = np.arange(k) + right
+    delta = poles[origin]  # delta[i, j] = dk[j] - dk[origin[i]]
+    left = np.tri(k, dtype=bool)  # poles at or below dk[i]
+    lo = np.where(right, -0.5 * gap, 0)
+    hi = np.where(right, 0, np.where(last, gap, 0.5 * gap))
+    flo = np.where(right, f_mid, -np.inf)
+    fhi = np.where(right | last, np.inf, f_mid)
+    tau = 0.5 * (lo + hi)
+    active = np.arange(k)
+    for _ in range(100):
+        t, g, r, la = tau[active], gap[active], right[active], last[active]
+        offset = delta[active] - t[:, None]  # dk[j] - x
+        terms = zk2 / offset
+        derivs = terms / offset
+        is_left = left[active]
+        psi = np.where(is_left, terms, 0).sum(axis=1)
+        phi = terms.sum(axis=1) - psi
+        dpsi = np.where(is_left, derivs, 0).sum(axis=1)
+        dphi = derivs.sum(axis=1) - dpsi
+        f = 1 / rho + psi + phi
+        below = f < 0
+        lo[active] = np.where(below, t, lo[active])
+        flo[active] = np.where(below, f, flo[active])
+        hi[active] = np.where(below, hi[active], t)
+        fhi[active] = np.where(below, fhi[active], f)
+        # model psi and phi by single poles at dk[i] and dk[i + 1] matching value and slope, and take the root of
+        # the model, see Bunch, Nielsen and Sorensen
+        rows = np.arange(len(active))
+        to_left = -offset[rows, active]  # x - dk[i]
+        to_right = np.where(la, 0, offset[rows, np.minimum(active + 1, k - 1)])
+        b1 = dpsi * to_left**2
+        b2 = np.where(la, 0, dphi * to_right**2)
+        c = 1 / rho + psi + dpsi * to_left + np.where(la, 0, phi - dphi * to_right)
+        # quadratic in the distance to the origin, x - dk[i] or dk[i + 1] - x
+        B = np.where(r, -(c * g - b1 - b2), -(c * g + b1 + b2))
+        C = np.where(r, -b2 * g, b1 * g)
+        q = -0.5 * (B + np.copysign(np.sqrt(np.maximum(B**2 - 4 * c * C, 0)), B))
+        l, h, fl, fh = lo[active], hi[active], flo[active], fhi[active]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            candidates = np.stack([q / c, C / q]) * np.where(r, -1, 1)
+            # without a pole above the last root its model is linear, the quadratic would only lose accuracy
+            candidates[:, la] = (b1 / c)[la]
+            # fall back to the secant of the bracket, or bisection while one of its ends is still a pole
+            secant = l - fl * (h - l) / (fh - fl)
+        inside = (candidates > l) & (candidates < h)
+        fallback = np.where((secant > l) & (secant < h), secant, 0.5 * (l + h))
+        new = np.where(
+            inside[1], candidates[1], np.where(inside[0], candidates[0], fallback)
+        )
+        new = np.where(f == 0, t, new)
+        tau[active] = new
+        converged = (np.abs(new - t) <= 4 * eps * np.abs(new)) | (
+            hi[active] - lo[active]
+            <= 4 * eps * np.maximum(np.abs(lo[active]), np.abs(hi[active]))
+        )
+        active = active[~converged]
+        if len(active) == 0:
+            break
+    # differences lambda_i - dk[j], computed from the offsets to keep their relative accuracy
+    diff = tau[:, None] - delta
+    # weights consistent with the computed roots, Gu and Eisenstat
+    ratio = diff / np.where(np.eye(k, dtype=bool), 1, -poles)
+    np.fill_diagonal(ratio, 1)
+    zk = np.sqrt(np.abs(np.prod(ratio, axis=0) * np.diag(diff) / rho))
+    zk = np.copysign(zk, z[idx])
+    Q = zk[None, :] / -diff  # Q[i, j]: component j of eigenvector i
+    Q /= np.linalg.norm(Q, axis=1)[:, None]
+    d[idx] = dk[origin] + tau
+    V[:, idx] = V[:, idx] @ Q.T
+    order = np.argsort(d, kind="stable")
+    return d[order], V[:, order]
+
+
+@lru_cache(maxsize=None)
+def _get_sysv(n, dtype):
+    sysv, sysv_lwork = scipy.linalg.lapack.get_lapack_funcs(
+        ("sysv", "sysv_lwork"), dtype=dtype
+    )
+    work, _ = sysv_lwork(n, lower=1)
+    return sysv, int(work)
+
+
+def _solve_symmetric(a, b):
+    """
+    Solve `a x = b` for a symmetric, not necessarily positive definite `a`.
+
+    This calls LAPACK `sysv` directly, which is what `scipy.linalg.solve(assume_a="sym")` does as well, but without the
+    input checks and condition number estimate that dominate the run time for small systems.
+
+    Args:
+        a (numpy.ndarray): symmetric matrix
+        b (numpy.ndarray): right hand side
+
+    Returns:
+        numpy.ndarray: solution `x`
+    """
+    sysv, lwork = _get_sysv(len(a), np.dtype(a.dtype))
+    # the transpose of the symmetric matrix is Fortran ordered and can be passed without reordering
+    _, _, x, info = sysv(a.T, b, lwork=lwork, lower=1)
+    if info > 0:
+        raise np.linalg.LinAlgError("Singular matrix")
+    return x
+
+
 class QuasiNewtonInteractive:
     """
     Interactive class of Quasi Newton. This class can be used without a pyiron job definition.
@@ -22,6 +204,8 @@ class QuasiNewtonInteractive:
         use_eigenvalues=True,
         symmetrize=True,
         max_displacement=0.1,
+        incremental_eig=False,
+        dtype=np.float64,
     ):
         """
         Args:
@@ -35,11 +219,24 @@ class QuasiNewtonInteractive:
             symmetrize (bool): Whether to symmetrize forces following the box symmetries. DFT
                 calculations might fail if set to `False`
             max_displacement (float): Maximum displacement allowed for an atom.
+            incremental_eig (bool): Whether to update the eigendecomposition of the Hessian along with its low rank
+                updates instead of recomputing it after every step. It is still recomputed from scratch every
+                `max_eig_updates` steps to keep rounding errors in check.
+            dtype (type): Floating point type in which the Hessian and its eigendecomposition are stored and
+                solved. `numpy.float32` halves the memory and speeds up the linear algebra of large systems, the
+                displacements are always returned in double precision.
         """
+        self.dtype = np.dtype(dtype)
         self.use_eigenvalues = use_eigenvalues
+        self.incremental_eig = incremental_eig
+        self.max_eig_updates = 20
+        self._eig_updates = 0
         self._hessian = None
+        # whether the Hessian array was handed out and must be copied before it is updated in place
+        self._hessian_shared = False
         self._eigenvalues = None
         self._eigenvectors = None
+        self._lower = None
         self.g_old = None
         self.symmetry = None
         self.max_displacement = max_displacement
@@ -64,20 +261,27 @@ class QuasiNewtonInteractive:
         else:
             self.hessian = starting_h * np.eye(np.prod(structure.positions.shape))
         if diffusion_id is not None and diffusion_direction is not None:
-            v = np.zeros_like(structure.positions)
-            v[diffusion_id] = diffusion_direction
-            v = v.flatten()
-            self.hessian -= (
-                (starting_h + 1) * np.einsum("i,j->ij", v, v) / np.linalg.norm(v) ** 2
-            )
+            v = np.zeros(np.prod(structure.positions.shape))
+            v.reshape(-1, 3)[diffusion_id] = diffusion_direction
+            if np.ndim(starting_h) == 0:
+                self._update_symmetric((-(starting_h + 1) / v.dot(v), v))
+            else:
+                self.hessian -= (starting_h + 1) * np.outer(v, v) / v.dot(v)
             self.use_eigenvalues = True
         elif diffusion_id is not None or diffusion_direction is not None:
             raise ValueError("diffusion id or diffusion direction not specified")
 
     def _set_regularization(self, g, max_cycle=20, max_value=20, tol=1.0e-8):
         self.regularization = -2
+        if self.use_eigenvalues:
+            # the projection on the eigenvectors does not depend on the regularization
+            g_projected = self.eigenvectors.T @ g
         for _ in range(max_cycle):
-            if np.absolute(self.inv_hessian.dot(g)).max() < self.max_displacement:
+            if self.use_eigenvalues:
+                dx = self._softened_solve(g_projected)
+            else:
+                dx = self._solve(g)
+            if np.absolute(dx).max() < self.max_displacement:
                 break
             self.regularization += 1
             if np.absolute(self.regularization) > max_value:
@@ -86,35 +290,57 @@ class QuasiNewtonInteractive:
     @property
     def inv_hessian(self):
         if self.regularization is None:
-            return np.linalg.inv(self.hessian)
+            return np.linalg.inv(self._hessian)
         if self.use_eigenvalues:
-            return np.einsum(
-                "ik,k,jk->ij",
-                self.eigenvectors,
-                self.eigenvalues
-                / (self.eigenvalues**2 + np.exp(self.regularization)),
-                self.eigenvectors,
-            )
+            w = self.eigenvalues / (self.eigenvalues**2 + np.exp(self.regularization))
+            return (self.eigenvectors * w) @ self.eigenvectors.T
         else:
-            return np.linalg.inv(
-                self.hessian + np.eye(len(self.hessian)) * np.exp(self.regularization)
+            # the Hessian is symmetric, but not necessarily positive definite around saddle points
+            return _solve_symmetric(
+                self._get_regularized_hessian(),
+                np.eye(len(self._hessian), dtype=self.dtype),
             )
 
+    def _get_regularized_hessian(self):
+        hessian = self._hessian.copy()
+        hessian.flat[:: len(hessian) + 1] += np.exp(self.regularization)
+        return hessian
+
+    def _solve(self, g):
+        """Displacement `-H^{-1} g` with the current regularization, without forming the inverse Hessian."""
+        if self.regularization is None:
+            return -_solve_symmetric(self._hessian, g)
+        if self.use_eigenvalues:
+            return self._softened_solve(self.eigenvectors.T @ g)
+        else:
+            return -_solve_symmetric(self._get_regularized_hessian(), g)
+
+    def _softened_solve(self, g_projected):
+        """Displacement with eigenvalue softening from the gradient projected on the eigenvectors, `V^T g`."""
+        w = self.eigenvalues / (self.eigenvalues**2 + np.exp(self.regularization))
+        return -self.eigenvectors @ (w * g_projected)
+
     @property
     def hessian(self):
+        """Current Hessian, later updates do not modify the returned array."""
+        self._hessian_shared = True
         return self._hessian
 
     @hessian.setter
     def hessian(self, v):
-        self._hessian = np.array(v)
+        self._hessian = np.array(v, dtype=self.dtype)
         length = int(np.sqrt(np.prod(self._hessian.shape)))
         self._hessian = self._hessian.reshape(length, length)
+        # updates and solvers only work on one triangle, so the stored matrix has to be exactly symmetric
+        self._hessian = 0.5 * (self._hessian + self._hessian.T)
+        self._hessian_shared = False
         self._eigenvalues = None
         self._eigenvectors = None
         self.regularization = None
 
     def _calc_eig(self):
-        self._eigenvalues, self._eigenvectors = np.linalg.eigh(self.hessian)
+        self._eigenvalues, self._eigenvectors = np.linalg.eigh(self._hessian)
+        self._eig_updates = 0
 
     @property
     def eigenvalues(self):
@@ -131,55 +357,107 @@ class QuasiNewtonInteractive:
     def get_dx(self, g, threshold=1e-4, mode="PSB", update_hessian=True):
         if update_hessian:
             self.update_hessian(g, threshold=threshold, mode=mode)
-        self.dx = -np.einsum("ij,j->i", self.inv_hessian, g.flatten()).reshape(-1, 3)
+        # flat views of the (n_atoms, 3) arrays, flatten would copy them in every step
+        g_flat = np.ravel(g).astype(self.dtype, copy=False)
+        self.dx = self._solve(g_flat).astype(float, copy=False).reshape(-1, 3)
         if self.symmetry is not None:
             self.dx = self.symmetry.symmetrize_vectors(self.dx)
         if (
             np.linalg.norm(self.dx, axis=-1).max() > self.max_displacement
             and self.regularization is None
         ):
-            self._set_regularization(g=g.flatten())
+            self._set_regularization(g=g_flat)
             return self.get_dx(
                 g=g, threshold=threshold, mode=mode, update_hessian=False
             )
         return self.dx
 
-    @staticmethod
-    def _get_SR(dx, dg, H_tmp, threshold=1e-4):
+    def _update_symmetric(self, *updates):
+        """
+        Apply symmetric rank one and rank two updates to the Hessian in place, or to a copy if the current array
+        was handed out through `hessian`.
+
+        Args:
+            *updates (tuple): `(alpha, x)` adds `alpha * x x^T`, `(alpha, x, y)` adds `alpha * (x y^T + y x^T)`
+        """
+        if self._hessian_shared:
+            self._hessian = self._hessian.copy()
+            self._hessian_shared = False
+        # BLAS works on the Fortran ordered transpose, which is the same matrix and shares the memory
+        a = self._hessian.T
+        syr, syr2 = scipy.linalg.blas.get_blas_funcs(("syr", "syr2"), (a,))
+        for alpha, x, *y in updates:
+            if len(y) == 0:
+                a = syr(alpha, x, a=a, lower=1, overwrite_a=1)
+            else:
+                a = syr2(alpha, x, y[0], a=a, lower=1, overwrite_a=1)
+        hessian = a.T
+        # only the upper triangle of the C ordered matrix is updated, mirror it to the lower one
+        if self._lower is None or self._lower.shape != hessian.shape:
+            self._lower = np.tri(len(hessian), k=-1, dtype=bool)
+        np.copyto(hessian, hessian.T, where=self._lower)
+        self._hessian = hessian
+        if (
+            self.incremental_eig
+            and self._eigenvalues is not None
+            and self._eig_updates < self.max_eig_updates
+        ):
+            for alpha, x, *y in updates:
+                if len(y) == 0:
+                    rank_one = [(alpha, x)]
+                else:
+                    # x y^T + y x^T = ((x + y)(x + y)^T - (x - y)(x - y)^T) / 2
+                    rank_one = [(alpha / 2, x + y[0]), (-alpha / 2, x - y[0])]
+                for beta, u in rank_one:
+                    self._eigenvalues, self._eigenvectors = _rank_one_update_eig(
+                        self._eigenvalues, self._eigenvectors, beta, u
+                    )
+            self._eig_updates += 1
+            if not (
+                np.isfinite(self._eigenvalues).all()
+                and np.isfinite(self._eigenvectors).all()
+            ):
+                self._calc_eig()
+        else:
+            self._eigenvalues = None
+            self._eigenvectors = None
+        self.regularization = None
+
+    def _symv(self, alpha, x, beta=0.0, y=None):
+        """`alpha * H x + beta * y` via BLAS `symv`, which only reads one triangle of the Hessian."""
+        (symv,) = scipy.linalg.blas.get_blas_funcs(("symv",), (self._hessian,))
+        if y is None:
+            return symv(alpha, self._hessian.T, x, lower=1)
+        return symv(alpha, self._hessian.T, x, beta=beta, y=y, lower=1)
+
+    def _update_SR(self, dx, dg, H_tmp, threshold=1e-4):
         denominator = np.dot(H_tmp, dx)
         if np.absolute(denominator) < threshold:
             denominator += threshold
-        return np.outer(H_tmp, H_tmp) / denominator
-
-    @staticmethod
-    def _get_PSB(dx, dg, H_tmp):
-        dxdx = np.einsum("i,i->", dx, dx)
-        dH = np.einsum("i,j->ij", H_tmp, dx)
-        dH = (dH + dH.T) / dxdx
-        return (
-            dH
-            - np.einsum("i,i,j,k->jk", dx, H_tmp, dx, dx, optimize="optimal")
-            / dxdx**2
-        )
+        self._update_symmetric((1 / denominator, H_tmp))
+
+    def _update_PSB(self, dx, dg, H_tmp):
+        dxdx = dx.dot(dx)
+        # (H_tmp dx^T + dx H_tmp^T) / dxdx - (H_tmp . dx) dx dx^T / dxdx^2
+        self._update_symmetric((1 / dxdx, H_tmp, dx), (-H_tmp.dot(dx) / dxdx**2, dx))
 
-    @staticmethod
-    def _get_BFGS(dx, dg, H):
-        Hx = H.dot(dx)
-        return np.outer(dg, dg) / dg.dot(dx) - np.outer(Hx, Hx) / dx.dot(Hx)
+    def _update_BFGS(self, dx, dg):
+        Hx = self._symv(1.0, dx)
+        self._update_symmetric((1 / dg.dot(dx), dg), (-1 / dx.dot(Hx), Hx))
 
     def update_hessian(self, g, threshold=1e-4, mode="PSB"):
         if self.g_old is None:
             self.g_old = g
             return
-        dg = self.get_dg(g).flatten()
-        dx = self.dx.flatten()
-        H_tmp = dg - np.einsum("ij,j->i", self.hessian, dx)
+        dg = np.ravel(self.get_dg(g)).astype(self.dtype, copy=False)
+        dx = np.ravel(self.dx).astype(self.dtype, copy=False)
+        H_tmp = self._symv(-1.0, dx, beta=1.0, y=dg)
         if mode == "SR":
-            self.hessian = self._get_SR(dx, dg, H_tmp) + self.hessian
+            self._update_SR(dx, dg, H_tmp)
         elif mode == "PSB":
-            self.hessian = self._get_PSB(dx, dg, H_tmp) + self.hessian
+            self._update_PSB(dx, dg, H_tmp)
         elif mode == "BFGS":
-            self.hessian = self._get_BFGS(dx, dg, self.hessian) + self.hessian
+            self._update_BFGS(dx, dg)
         else:
             raise ValueError(
                 "Mode not recognized: {}. Choose from `SR`, `PSB` and `BFGS`".format(
@@ -236,13 +514,16 @@ def run_qn(
         max_displacement=max_displacement,
         symmetrize=symmetrize,
     )
+    # compare squared norms to avoid the square roots in every step
+    force_tolerance_squared = ionic_force_tolerance**2
+    min_displacement_squared = min_displacement**2
     job.run()
     for _ in range(ionic_steps):
         f = job.output.forces[-1]
-        if np.linalg.norm(f, axis=-1).max() < ionic_force_tolerance:
+        if np.einsum("ij,ij->i", f, f).max() < force_tolerance_squared:
             break
         dx = qn.get_dx(-f, mode=mode)
-        if np.linalg.norm(dx, axis=-1).max() < min_displacement:
+        if np.einsum("ij,ij->i", dx, dx).max() < min_displacement_squared:
             warnings.warn("line search alpha is zero")
             break
         job.structure.positions += dx
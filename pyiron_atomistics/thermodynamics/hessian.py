@@ -126,16 +126,15 @@ class HessianJob(GenericInteractive):
 
     def interactive_cells_setter(self, cell):
         if np.sum(self._stiffness_tensor) != 0:
-            epsilon = np.einsum(
-                "ij,jk->ik",
-                self.structure.cell,
-                np.linalg.inv(self._reference_structure.cell),
-            ) - np.eye(3)
+            # cell @ inv(reference_cell) without forming the inverse
+            epsilon = np.linalg.solve(
+                self._reference_structure.cell.T, self.structure.cell.T
+            ).T - np.eye(3)
             epsilon = (epsilon + epsilon.T) * 0.5
             epsilon = np.append(
                 epsilon.diagonal(), np.roll(epsilon, -1, axis=0).diagonal()
             )
-            pressure = -np.einsum("ij,j->i", self._stiffness_tensor, epsilon)
+            pressure = -self._stiffness_tensor @ epsilon
             self._pressure = pressure[3:] * np.roll(np.eye(3), -1, axis=1)
             self._pressure += self._pressure.T + np.eye(3) * pressure[:3]
             self._pressure_times_volume = (
@@ -146,7 +145,7 @@ class HessianJob(GenericInteractive):
         displacements = self.structure.get_scaled_positions()
         displacements -= self._reference_structure.get_scaled_positions()
         displacements -= np.rint(displacements)
-        self._displacements = np.einsum("ji,ni->nj", self.structure.cell, displacements)
+        self._displacements = displacements @ self.structure.cell.T
 
     def calculate_forces(self):
         position_transformed = self._displacements.reshape(
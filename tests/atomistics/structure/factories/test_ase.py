@@ -0,0 +1,36 @@
+# coding: utf-8
+# Copyright (c) Max-Planck-Institut für Eisenforschung GmbH - Computational Materials Design (CM) Department
+# Distributed under the terms of "New BSD License", see the LICENSE file.
+
+import unittest
+import numpy as np
+from pyiron_atomistics.atomistics.structure.factories.ase import AseFactory
+
+
+class TestAseFactory(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.ase = AseFactory()
+
+    def test_bulk_cached_copies(self):
+        """Repeated calls with the same arguments should give equal, but independent structures."""
+        first = self.ase.bulk("Al", cubic=True)
+        first.positions += 1
+        second = self.ase.bulk("Al", cubic=True)
+        self.assertIsNot(first, second, "Cached structure returned without copying.")
+        self.assertTrue(np.allclose(second.positions, self.ase.bulk("Al", cubic=True).positions),
+                        "Modifying a returned structure changed the cached one.")
+        self.assertFalse(np.allclose(first.positions, second.positions),
+                         "Modifying a returned structure changed the cached one.")
+
+    def test_crystal_unhashable(self):
+        """Arguments that cannot be cached should still work."""
+        structure = self.ase.crystal("Al", [(0, 0, 0)], spacegroup=225, cellpar=np.array([4.05, 4.05, 4.05, 90, 90, 90]))
+        self.assertEqual(len(structure), 4, "Wrong number of atoms.")
+        self.assertEqual(len(self.ase.crystal("Al", [(0, 0, 0)], spacegroup=225, cellpar=4.05)), 4,
+                         "Wrong number of atoms.")
+
+
+if __name__ == "__main__":
+    unittest.main()
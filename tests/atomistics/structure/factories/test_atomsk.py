@@ -2,8 +2,73 @@
 # Copyright (c) Max-Planck-Institut für Eisenforschung GmbH - Computational Materials Design (CM) Department
 # Distributed under the terms of "New BSD License", see the LICENSE file.
 
+import io
+import os
+import unittest
+import numpy as np
+
 from pyiron_atomistics._tests import TestWithProject
-from pyiron_atomistics.atomistics.structure.factories.atomsk import AtomskFactory, AtomskError, _ATOMSK_EXISTS
+from pyiron_atomistics.atomistics.structure.atoms import Atoms
+from pyiron_atomistics.atomistics.structure.factories.atomsk import AtomskFactory, AtomskError, AtomskParaInfo, \
+    _ATOMSK_EXISTS, _to_exyz, _read_exyz, _check_output
+
+
+class TestExyz(unittest.TestCase):
+    """Tests of the extxyz transport to and from atomsk, which do not need atomsk itself."""
+
+    def round_trip(self, structure):
+        return _read_exyz(io.BytesIO(_to_exyz(structure)))
+
+    def assert_same_structure(self, structure, read):
+        self.assertEqual(list(structure.get_chemical_symbols()), list(read.get_chemical_symbols()),
+                         "Wrong species.")
+        self.assertEqual(list(structure.get_species_symbols()), list(read.get_species_symbols()),
+                         "Wrong order of species.")
+        self.assertTrue(np.array_equal(structure.positions, read.positions), "Wrong positions.")
+        self.assertTrue(np.array_equal(structure.cell.array, read.cell.array), "Wrong cell.")
+        self.assertEqual(list(structure.pbc), list(read.pbc), "Wrong pbc.")
+
+    def test_round_trip_species(self):
+        """Should keep species in order of their first appearance, which is not sorted."""
+        structure = Atoms(['Ni', 'Cu', 'Ni', 'Al', 'Cu'],
+                          positions=np.random.default_rng(0).random((5, 3)) * 3.6,
+                          cell=3.6 * np.eye(3) + 0.1, pbc=True)
+        self.assert_same_structure(structure, self.round_trip(structure))
+
+    def test_round_trip_single_atom(self):
+        """Should read a frame with a single atom."""
+        structure = Atoms(['Fe'], positions=[[0.1, 0.2, 0.3]], cell=2.8 * np.eye(3), pbc=True)
+        self.assert_same_structure(structure, self.round_trip(structure))
+
+    def test_round_trip_partial_pbc(self):
+        """Should keep non periodic directions."""
+        structure = Atoms(['Cu', 'Ni'], positions=[[0, 0, 0], [1.8, 1.8, 5]], cell=3.6 * np.eye(3),
+                          pbc=[True, True, False])
+        self.assert_same_structure(structure, self.round_trip(structure))
+
+    def test_round_trip_magmoms(self):
+        """Should pass additional per atom arrays through ASE."""
+        structure = Atoms(['Fe', 'Co'], positions=[[0, 0, 0], [1.4, 1.4, 1.4]], cell=2.8 * np.eye(3), pbc=True)
+        structure.set_initial_magnetic_moments([2, -1])
+        read = self.round_trip(structure)
+        self.assertEqual(list(structure.get_chemical_symbols()), list(read.get_chemical_symbols()),
+                         "Wrong species.")
+        self.assertTrue(np.allclose(structure.positions, read.positions), "Wrong positions.")
+        self.assertEqual(list(read.get_initial_magnetic_moments()), [2, -1], "Wrong magnetic moments.")
+
+    def test_unexpected_output(self):
+        """Should raise AtomskError if the output does not start with the number of atoms."""
+        with self.assertRaises(AtomskError):
+            _read_exyz(io.BytesIO(b"no atoms here\n"))
+
+    def test_error_output(self):
+        """Should raise AtomskError with the atomsk error message."""
+        with self.assertRaisesRegex(AtomskError, "atomsk returned error"):
+            _read_exyz(io.BytesIO(b" X!X ERROR: unknown option\n"))
+        with self.assertRaisesRegex(AtomskError, "atomsk returned error"):
+            _check_output(b"some log\n X!X ERROR: unknown option\n")
+        _check_output(b"4\nLattice=\"3.6 0 0 0 3.6 0 0 0 3.6\"\n")
+
 
 if _ATOMSK_EXISTS:
     class TestAtomskFactory(TestWithProject):
@@ -44,6 +109,30 @@ if _ATOMSK_EXISTS:
 
             self.assertEqual(len(structure) * 2, len(duplicate), "Wrong number of atoms.")
 
+        def test_build_many(self):
+            """Should build the same structures as calling build on each builder."""
+
+            structures = [self.atomsk.create('fcc', a, 'Cu').build() for a in (3.5, 3.6, 3.6)]
+            builders = [self.atomsk.modify(s).duplicate(2, 1, 1) for s in structures]
+            builders.append(self.atomsk.create('fcc', 3.6, 'Cu'))
+            try:
+                many = self.atomsk.build_many(builders)
+            except Exception as e:
+                self.fail(f"atomsk build_many fails with {e}.")
+
+            self.assertEqual(len(many), len(builders), "Wrong number of structures.")
+            for s, m in zip(structures, many):
+                self.assertEqual(len(s) * 2, len(m), "Wrong number of atoms.")
+                self.assertEqual(s.cell[0, 0] * 2, m.cell[0, 0], "Wrong lattice parameter in duplicate direction.")
+            self.assertIsNot(many[1], many[2], "Identical inputs should still give separate structures.")
+            self.assertEqual(len(many[-1]), 4, "Wrong number of atoms.")
+
+            builders = [self.atomsk.modify(s).duplicate(2, 1, 1) for s in structures]
+            para_info = AtomskParaInfo(num_workers=2, num_inputs_per_process=2)
+            for s, m in zip(many, self.atomsk.build_many(builders, para_info=para_info)):
+                self.assertEqual(len(s), len(m), "Parallel build gives different structures.")
+            self.assertEqual(os.listdir(AtomskFactory._scratch), [], "Files left in scratch directory.")
+
         def test_error(self):
             """Should raise AtomskError on errors during call to atomsk."""
 
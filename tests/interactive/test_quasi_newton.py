@@ -1,8 +1,9 @@
 import os
 import numpy as np
 import unittest
+import warnings
 from pyiron_atomistics.project import Project
-from pyiron_atomistics.interactive.quasi_newton import QuasiNewtonInteractive, run_qn
+from pyiron_atomistics.interactive.quasi_newton import QuasiNewtonInteractive, run_qn, _rank_one_update_eig
 
 
 class TestQuasiNewton(unittest.TestCase):
@@ -44,6 +45,120 @@ class TestQuasiNewton(unittest.TestCase):
         qn = QuasiNewtonInteractive(structure, diffusion_id=0, diffusion_direction=[1, 0, 0])
         self.assertEqual(np.sum(np.linalg.eigh(qn.hessian)[0] < 0), 1)
 
+    def test_hessian_symmetric(self):
+        structure = self.project.create.structure.bulk('Al', cubic=True)
+        H = np.random.default_rng(0).normal(size=(12, 12)) + 10 * np.eye(12)
+        qn = QuasiNewtonInteractive(structure, starting_h=H, symmetrize=False)
+        self.assertTrue(np.array_equal(qn.hessian, qn.hessian.T), msg="Hessian not symmetrized")
+        self.assertTrue(np.allclose(qn.hessian, 0.5 * (H + H.T)))
+
+    def test_update_hessian(self):
+        structure = self.project.create.structure.bulk('Al', cubic=True)
+        g_old, g = np.random.default_rng(0).normal(size=(2, len(structure), 3))
+        for mode in ['SR', 'PSB', 'BFGS']:
+            qn = QuasiNewtonInteractive(structure, symmetrize=False)
+            qn.get_dx(g_old, mode=mode)
+            H = qn.hessian.copy()
+            dx, dg = qn.dx.flatten(), (g - g_old).flatten()
+            H_tmp = dg - H @ dx
+            if mode == 'SR':
+                H += np.outer(H_tmp, H_tmp) / H_tmp.dot(dx)
+            elif mode == 'PSB':
+                H += (np.outer(H_tmp, dx) + np.outer(dx, H_tmp)) / dx.dot(dx)
+                H -= H_tmp.dot(dx) * np.outer(dx, dx) / dx.dot(dx) ** 2
+            else:
+                Hx = qn.hessian @ dx
+                H += np.outer(dg, dg) / dg.dot(dx) - np.outer(Hx, Hx) / dx.dot(Hx)
+            qn.update_hessian(g, mode=mode)
+            self.assertTrue(np.allclose(qn.hessian, H), msg=f"Wrong {mode} update")
+            self.assertTrue(np.array_equal(qn.hessian, qn.hessian.T), msg=f"{mode} update not symmetric")
+
+    def test_hessian_snapshot(self):
+        structure = self.project.create.structure.bulk('Al', cubic=True)
+        g_old, g = np.random.default_rng(0).normal(size=(2, len(structure), 3))
+        qn = QuasiNewtonInteractive(structure, symmetrize=False)
+        H = qn.hessian
+        qn.get_dx(g_old)
+        qn.get_dx(g)
+        self.assertTrue(np.array_equal(H, 10 * np.eye(3 * len(structure))), msg="Hessian updated in place")
+        self.assertFalse(np.array_equal(qn.hessian, H), msg="Hessian not updated")
+
+    def test_dtype(self):
+        structure = self.project.create.structure.bulk('Al', cubic=True).repeat(2)
+        rng = np.random.default_rng(2)
+        for use_eigenvalues in [True, False]:
+            qn = QuasiNewtonInteractive(structure, symmetrize=False, use_eigenvalues=use_eigenvalues)
+            qn_single = QuasiNewtonInteractive(
+                structure, symmetrize=False, use_eigenvalues=use_eigenvalues, dtype=np.float32
+            )
+            for _ in range(5):
+                g = rng.normal(size=structure.positions.shape)
+                dx = qn_single.get_dx(g)
+                self.assertEqual(dx.dtype, np.float64, msg="Displacements not returned in double precision")
+                self.assertTrue(np.allclose(qn.get_dx(g), dx, atol=1e-4))
+            self.assertEqual(qn_single.hessian.dtype, np.float32)
+            self.assertTrue(np.allclose(qn.hessian, qn_single.hessian, atol=1e-3))
+        for mode in ['PSB', 'BFGS']:
+            qn = QuasiNewtonInteractive(structure, symmetrize=False, max_displacement=0.05)
+            qn_single = QuasiNewtonInteractive(
+                structure, symmetrize=False, max_displacement=0.05, incremental_eig=True, dtype=np.float32
+            )
+            with warnings.catch_warnings():
+                warnings.simplefilter("error")
+                for _ in range(15):
+                    g = rng.normal(size=structure.positions.shape)
+                    self.assertTrue(np.allclose(qn.get_dx(g, mode=mode), qn_single.get_dx(g, mode=mode), atol=1e-4))
+            self.assertGreater(qn_single._eig_updates, 0, msg="Eigendecomposition was not updated incrementally")
+            self.assertEqual(qn_single.eigenvalues.dtype, np.float32)
+            self.assertEqual(qn_single.eigenvectors.dtype, np.float32)
+
+    def test_incremental_eig_single_displacement(self):
+        structure = self.project.create.structure.bulk('Al', cubic=True).repeat(2)
+        displacement = np.zeros_like(structure.positions)
+        displacement[0, 0] = 0.1
+        for incremental_eig in [False, True]:
+            qn = QuasiNewtonInteractive(structure, symmetrize=False, incremental_eig=incremental_eig)
+            x = displacement.copy()
+            for _ in range(10):
+                if np.absolute(x).max() < 1e-8:
+                    break
+                dx = qn.get_dx(x, mode='PSB')
+                self.assertTrue(np.isfinite(dx).all(), msg="Displacement is not finite")
+                x = x + dx
+            self.assertLess(np.absolute(x).max(), 1e-8, msg="Harmonic system not relaxed")
+
+    def test_rank_one_update_eig(self):
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            eigenvalues = np.sort(rng.normal(size=30))
+            eigenvectors = np.linalg.qr(rng.normal(size=(30, 30)))[0]
+            # nearly an eigenvector: all but one component are tiny, but not zero
+            u = eigenvectors[:, rng.integers(30)] + rng.normal(size=30) * 10.0 ** rng.uniform(-16, -6)
+            alpha = rng.normal()
+            w, v = _rank_one_update_eig(eigenvalues, eigenvectors, alpha, u)
+            self.assertTrue(np.isfinite(v).all())
+            self.assertTrue(np.allclose(
+                (v * w) @ v.T, (eigenvectors * eigenvalues) @ eigenvectors.T + alpha * np.outer(u, u)
+            ))
+            self.assertTrue(np.allclose(v.T @ v, np.eye(30)))
+
+    def test_incremental_eig(self):
+        structure = self.project.create.structure.bulk('Al', cubic=True).repeat(2)
+        rng = np.random.default_rng(1)
+        for mode in ['SR', 'PSB', 'BFGS']:
+            qn = QuasiNewtonInteractive(structure, symmetrize=False, max_displacement=0.05)
+            qn_inc = QuasiNewtonInteractive(structure, symmetrize=False, max_displacement=0.05, incremental_eig=True)
+            for _ in range(5):
+                g = rng.normal(size=structure.positions.shape)
+                self.assertTrue(np.allclose(qn.get_dx(g, mode=mode), qn_inc.get_dx(g, mode=mode)),
+                                msg=f"Incremental eigendecomposition gives different {mode} steps")
+            self.assertGreater(qn_inc._eig_updates, 0, msg="Eigendecomposition was not updated incrementally")
+            eigenvalues, eigenvectors = np.linalg.eigh(qn_inc.hessian)
+            self.assertTrue(np.allclose(qn_inc.eigenvalues, eigenvalues))
+            self.assertTrue(np.allclose(
+                (qn_inc.eigenvectors * qn_inc.eigenvalues) @ qn_inc.eigenvectors.T, qn_inc.hessian
+            ))
+
 
 if __name__ == '__main__':
     unittest.main()